@@ -1,17 +1,33 @@
-from fastapi import APIRouter,UploadFile, File, Form
-from app.api.schemas import ExcelQueryRequest, ExcelQueryResponse, MatchResult, RelationshipInfo
+from fastapi import APIRouter,UploadFile, File, Form, Depends, Header
+from fastapi.responses import StreamingResponse
+from typing import List
+from app.api.schemas import ExcelQueryRequest, ExcelQueryResponse, MatchResult, RelationshipInfo, BatchQuestionResult, BatchQueryResponse, IndexInfo, EvictionResult
+from app.core.config import settings
 from app.services.orchestrator import Orchestrator
+from app.services.lifecycle import IndexLifecycleManager
+import json
 import logging
+import secrets
 from fastapi import HTTPException
 
 router = APIRouter()
 
+def require_admin(x_admin_token: str = Header(default="")):
+    # Fail closed: without a configured token the admin API is disabled
+    if not settings.admin_token:
+        raise HTTPException(status_code=403, detail="Admin API is disabled; set ADMIN_TOKEN to enable it")
+    if not secrets.compare_digest(x_admin_token.encode(), settings.admin_token.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+admin_router = APIRouter(prefix="/admin", dependencies=[Depends(require_admin)])
+
 @router.post("/upload", response_model=ExcelQueryResponse)
 async def upload_and_query(
     excel_file: UploadFile = File(..., description="Excel file to upload"),
     query: str = Form(..., description="Natural language question"),
     top_k: int = Form(default=10),
-    sheet_filter: str = Form(default=None)
+    sheet_filter: str = Form(default=None),
+    expand_joins: bool = Form(default=False, description="Add rows linked to the top matches through detected keys")
 ):
     try:
         orchestrator = Orchestrator()
@@ -24,7 +40,8 @@ async def upload_and_query(
             file_bytes=file_bytes,
             query=query,
             top_k=top_k,
-            sheet_filter=sheet_filter
+            sheet_filter=sheet_filter,
+            expand_joins=expand_joins
         )
         
         return ExcelQueryResponse(
@@ -33,7 +50,7 @@ async def upload_and_query(
             chunks_indexed=result["chunks_indexed"],
             top_matches=[MatchResult(**m) for m in result["matches"]],
             sheets_parsed=result["sheets"],
-            relationships_detected=[RelationshipInfo(**r.dict()) for r in result["relationships"]]
+            relationships_detected=[RelationshipInfo.from_domain(r) for r in result["relationships"]]
         )
     
     except ValueError as e:
@@ -45,6 +62,83 @@ async def upload_and_query(
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
 
+def _batch_result(r: dict) -> BatchQuestionResult:
+    return BatchQuestionResult(
+        index=r["index"],
+        query=r["query"],
+        answer=r["answer"],
+        top_matches=[MatchResult(**m) for m in r["matches"]],
+        error=r["error"]
+    )
+
+@router.post("/upload/batch", response_model=BatchQueryResponse)
+async def upload_and_query_batch(
+    excel_file: UploadFile = File(..., description="Excel file to upload"),
+    queries: List[str] = Form(..., description="Natural language questions (repeat the field once per question)"),
+    top_k: int = Form(default=10),
+    sheet_filter: str = Form(default=None),
+    stream: bool = Form(default=False, description="Stream results as NDJSON as each question finishes"),
+    expand_joins: bool = Form(default=False, description="Add rows linked to the top matches through detected keys")
+):
+    orchestrator = Orchestrator()
+    file_bytes = await excel_file.read()
+
+    if stream:
+        # Validate, ingest and search before any bytes are sent, so bad input still gets a 400
+        try:
+            summary, results = await orchestrator.prepare_batch(file_bytes, queries, top_k, sheet_filter, expand_joins)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
+        async def ndjson():
+            try:
+                async for event in orchestrator.stream_batch_answers(queries, summary, results):
+                    if event["event"] == "summary":
+                        body = {
+                            "event": "summary",
+                            "collection_name": event["collection_name"],
+                            "chunks_indexed": event["chunks_indexed"],
+                            "sheets_parsed": event["sheets"],
+                            "relationships_detected": [RelationshipInfo.from_domain(r).model_dump(by_alias=True) for r in event["relationships"]]
+                        }
+                    else:
+                        body = {"event": "result", **_batch_result(event).model_dump()}
+                    yield json.dumps(body, default=str) + "\n"
+            except Exception as e:
+                # Headers are already sent, so generation failures are reported in-band
+                logging.exception("Batch stream failed")
+                yield json.dumps({"event": "error", "detail": str(e)}) + "\n"
+
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    try:
+        result = await orchestrator.batch_query_from_bytes(
+            file_bytes=file_bytes,
+            queries=queries,
+            top_k=top_k,
+            sheet_filter=sheet_filter,
+            expand_joins=expand_joins
+        )
+
+        return BatchQueryResponse(
+            collection_name=result["collection_name"],
+            chunks_indexed=result["chunks_indexed"],
+            sheets_parsed=result["sheets"],
+            relationships_detected=[RelationshipInfo.from_domain(r) for r in result["relationships"]],
+            results=[_batch_result(r) for r in result["results"]]
+        )
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
 @router.post("/", response_model=ExcelQueryResponse)
 async def query_excel(request: ExcelQueryRequest):
     orchestrator = Orchestrator()
@@ -53,7 +147,8 @@ async def query_excel(request: ExcelQueryRequest):
         query=request.query,
         top_k=request.top_k,
         sheet_filter=request.sheet_filter,
-        type_filter=request.chunk_type_filter
+        type_filter=request.chunk_type_filter,
+        expand_joins=request.expand_joins
     )
     
     return ExcelQueryResponse(
@@ -62,5 +157,39 @@ async def query_excel(request: ExcelQueryRequest):
         chunks_indexed=result["chunks_indexed"],
         top_matches=[MatchResult(**m) for m in result["matches"]],
         sheets_parsed=result["sheets"],
-        relationships_detected=[RelationshipInfo(**r.dict()) for r in result["relationships"]]
-    )
\ No newline at end of file
+        relationships_detected=[RelationshipInfo.from_domain(r) for r in result["relationships"]]
+    )
+
+@admin_router.get("/indexes", response_model=List[IndexInfo])
+async def list_indexes():
+    lifecycle = IndexLifecycleManager()
+    try:
+        return [IndexInfo(**e) for e in await lifecycle.list_indexes()]
+    finally:
+        await lifecycle.close()
+
+@admin_router.post("/indexes/{workbook_id}/pin", response_model=IndexInfo)
+async def pin_index(workbook_id: str, pinned: bool = True):
+    lifecycle = IndexLifecycleManager()
+    try:
+        return IndexInfo(**await lifecycle.set_pinned(workbook_id, pinned))
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown workbook index: {workbook_id}")
+    finally:
+        await lifecycle.close()
+
+@admin_router.delete("/indexes/{workbook_id}", status_code=204)
+async def purge_index(workbook_id: str):
+    lifecycle = IndexLifecycleManager()
+    try:
+        await lifecycle.purge(workbook_id)
+    finally:
+        await lifecycle.close()
+
+@admin_router.post("/indexes/evict", response_model=EvictionResult)
+async def evict_indexes():
+    lifecycle = IndexLifecycleManager()
+    try:
+        return EvictionResult(evicted=await lifecycle.evict())
+    finally:
+        await lifecycle.close()
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
 from typing import List, Optional
+from app.models.domain import Relationship
 
 class ExcelQueryRequest(BaseModel):
     excel_file: str = Field(..., description="URL or path to the Excel file")
@@ -7,6 +8,7 @@ class ExcelQueryRequest(BaseModel):
     top_k: int = Field(default=10, ge=1, le=50)
     sheet_filter: Optional[str] = None
     chunk_type_filter: Optional[str] = None
+    expand_joins: bool = Field(default=False, description="Add rows linked to the top matches through detected keys")
 
 class MatchResult(BaseModel):
     content: str
@@ -23,10 +25,45 @@ class RelationshipInfo(BaseModel):
     class Config:
         populate_by_name = True
 
+    @classmethod
+    def from_domain(cls, rel: Relationship) -> "RelationshipInfo":
+        return cls(
+            type=rel.type,
+            from_col=f"{rel.sheet_a}.{rel.column_a}",
+            to_col=f"{rel.sheet_b}.{rel.column_b}",
+            overlap=f"{rel.overlap_ratio:.0%}"
+        )
+
 class ExcelQueryResponse(BaseModel):
     answer: str
     collection_name: str
     chunks_indexed: int
     top_matches: List[MatchResult]
     sheets_parsed: List[str]
-    relationships_detected: List[RelationshipInfo]
\ No newline at end of file
+    relationships_detected: List[RelationshipInfo]
+
+class BatchQuestionResult(BaseModel):
+    index: int
+    query: str
+    answer: str
+    top_matches: List[MatchResult]
+    error: Optional[str] = None
+
+class BatchQueryResponse(BaseModel):
+    collection_name: str
+    chunks_indexed: int
+    sheets_parsed: List[str]
+    relationships_detected: List[RelationshipInfo]
+    results: List[BatchQuestionResult]
+
+
+class IndexInfo(BaseModel):
+    workbook_id: str
+    collection_name: str
+    points: int = 0
+    pinned: bool = False
+    created_at: float
+    last_access: float
+
+class EvictionResult(BaseModel):
+    evicted: List[str]
@@ -6,10 +6,44 @@ class Settings(BaseSettings):
     embedding_model: str = "text-embedding-3-small"
     embedding_dim: int = 1536
     llm_model: str = "gpt-4.1-mini"
+    llm_max_concurrency: int = 5
+    embedding_batch_size: int = 256
+    batch_max_questions: int = 50
+
+    # OpenAI rate limits shared by all requests in this process (0 = unlimited)
+    embedding_rpm: int = 0
+    embedding_tpm: int = 0
+    llm_rpm: int = 0
+    llm_tpm: int = 0
 
     # Qdrant
     qdrant_url: str = "http://localhost:6333"
     qdrant_api_key: str = ""
+    # "per_file" keeps one collection per workbook; "shared" stores all workbooks
+    # in one (or a few sharded) collection(s) filtered by a workbook_id payload field
+    storage_mode: str = "per_file"
+    shared_collection_name: str = "excel_rag_shared"
+    shared_collection_shards: int = 1
+
+    # Remote sources
+    fetch_cache_dir: str = ".cache/remote_sources"
+    fetch_spool_max_bytes: int = 16 * 1024 * 1024
+    fetch_timeout: float = 60.0
+
+    # Index lifecycle (0 disables the limit)
+    lifecycle_state_dir: str = ".cache/lifecycle"
+    index_ttl_seconds: int = 0
+    index_max_points: int = 0
+    eviction_interval_seconds: int = 300
+    lifecycle_flush_seconds: int = 5
+    # Admin endpoints answer 403 until this is set
+    admin_token: str = ""
+
+    # Join expansion
+    join_index_dir: str = ".cache/join_indexes"
+    join_max_rows_per_key: int = 5
+    join_max_expanded_rows: int = 20
+    join_index_cache_size: int = 64
 
     # App
     log_level: str = "INFO"
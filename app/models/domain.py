@@ -1,7 +1,13 @@
+from dataclasses import dataclass, field
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 
-class ColumnMetadata(BaseModel):
+# ColumnMetadata, ColumnRole and Chunk are created per column / per row inside the
+# pipeline, so they are plain slotted dataclasses (no validation, no per-instance dict).
+# None of them is returned by the API; responses are built in app/api/schemas.py.
+
+@dataclass(slots=True)
+class ColumnMetadata:
     name: str
     index: int
     data_type: str
@@ -14,7 +20,8 @@ class SheetMetadata(BaseModel):
     columns: List[ColumnMetadata]
     total_rows: int
 
-class ColumnRole(BaseModel):
+@dataclass(slots=True)
+class ColumnRole:
     role: str  # primary_key, foreign_key, value, metadata
     data_type: str
     unique_count: int
@@ -30,9 +37,10 @@ class Relationship(BaseModel):
     overlapping_values: List[str]
     overlap_ratio: float
 
-class Chunk(BaseModel):
+@dataclass(slots=True)
+class Chunk:
     chunk_id: str
     chunk_type: str
     sheet_name: str
     content: str
-    payload: Dict[str, Any]
\ No newline at end of file
+    payload: Dict[str, Any] = field(default_factory=dict)
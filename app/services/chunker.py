@@ -1,6 +1,12 @@
 from typing import Dict, List
 from app.models.domain import SheetMetadata, ColumnRole, Relationship, Chunk
 from app.utils.text_helpers import expand_abbreviation, extract_keywords
+from app.services.join_index import join_columns
+
+def _chunk_id(kind: str, *parts) -> str:
+    # Length-prefixed so names containing "_" cannot collide (sheet "A_B" column "C" vs sheet "A" column "B_C");
+    # chunk ids become point ids, and a collision would overwrite another chunk
+    return f"{kind}_" + "_".join(f"{len(str(p))}:{p}" for p in parts)
 
 class SemanticChunker:
     def build_chunks(self, metadata: Dict[str, SheetMetadata], data: Dict, roles: Dict[str, Dict[str, ColumnRole]], relationships: List[Relationship]) -> List[Chunk]:
@@ -14,11 +20,14 @@ class SemanticChunker:
             # 1. Sheet Summary
             chunks.append(self._build_sheet_summary(meta, sheet_roles, sheet_rels))
             
-            # 2. Row Chunks
+            # 2. Row Chunks (column lists and PK lookup hoisted out of the per-row loop)
+            columns = [(c.name, sheet_data.get(c.name, [])) for c in meta.columns]
+            pk_col = next((c for c, r in sheet_roles.items() if r.role == "primary_key"), None)
+            join_cols = join_columns(sheet_name, sheet_roles, sheet_rels)
             for row_idx in range(meta.total_rows):
-                row_data = {h: sheet_data[h][row_idx] for h in [c.name for c in meta.columns] if row_idx < len(sheet_data.get(h, []))}
+                row_data = {h: values[row_idx] for h, values in columns if row_idx < len(values)}
                 if any(v is not None for v in row_data.values()):
-                    chunks.append(self._build_row_chunk(sheet_name, row_idx + 1, row_data, sheet_roles, sheet_rels))
+                    chunks.append(self._build_row_chunk(sheet_name, row_idx + 1, row_data, sheet_roles, sheet_rels, pk_col, join_cols))
             
             # 3. Column Profiles
             for col in meta.columns:
@@ -31,9 +40,10 @@ class SemanticChunker:
             
         return chunks
 
-    def _build_row_chunk(self, sheet_name, row_idx, row_data, roles, rels) -> Chunk:
+    def _build_row_chunk(self, sheet_name, row_idx, row_data, roles, rels, pk_col=None, join_cols=()) -> Chunk:
         # Simplified logic from original code
-        pk_col = next((c for c, r in roles.items() if r.role == "primary_key"), None)
+        if pk_col is None:
+            pk_col = next((c for c, r in roles.items() if r.role == "primary_key"), None)
         pk_val = row_data.get(pk_col)
         
         summary = f"Record in {sheet_name} (Row {row_idx})"
@@ -53,7 +63,11 @@ class SemanticChunker:
             chunk_type="row_semantic",
             sheet_name=sheet_name,
             content=content,
-            payload={"row_index": row_idx, "keywords": keywords, "primary_key": pk_val}
+            payload={
+                "row_index": row_idx, "keywords": keywords, "primary_key": pk_val,
+                # Linked-column values, used to expand this row through the join index
+                "join_keys": {c: str(row_data[c]) for c in join_cols if row_data.get(c) is not None}
+            }
         )
 
     def _build_sheet_summary(self, meta, roles, rels) -> Chunk:
@@ -66,8 +80,8 @@ class SemanticChunker:
         if not non_null: return None
         
         content = f"Column '{col_name}' in {sheet_name}. Contains {len(non_null)} values. Sample: {non_null[:3]}."
-        return Chunk(chunk_id=f"col_{sheet_name}_{col_name}", chunk_type="column_profile", sheet_name=sheet_name, content=content, payload={})
+        return Chunk(chunk_id=_chunk_id("col", sheet_name, col_name), chunk_type="column_profile", sheet_name=sheet_name, content=content, payload={})
 
     def _build_relationship_chunk(self, rel) -> Chunk:
         content = f"Link found: {rel.sheet_a}.{rel.column_a} <-> {rel.sheet_b}.{rel.column_b}."
-        return Chunk(chunk_id=f"rel_{rel.sheet_a}_{rel.column_a}", chunk_type="relationship", sheet_name=rel.sheet_a, content=content, payload={})
\ No newline at end of file
+        return Chunk(chunk_id=_chunk_id("rel", rel.sheet_a, rel.column_a, rel.sheet_b, rel.column_b), chunk_type="relationship", sheet_name=rel.sheet_a, content=content, payload={})
\ No newline at end of file
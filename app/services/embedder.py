@@ -1,13 +1,26 @@
 from openai import AsyncOpenAI
 from app.core.config import settings
+from app.services.rate_limiter import Priority, estimate_tokens, scheduler
 
 class Embedder:
     def __init__(self):
         self.client = AsyncOpenAI(api_key=settings.openai_api_key)
 
-    async def embed(self, texts: list[str]) -> list[list[float]]:
+    async def embed(self, texts: list[str], priority: Priority = Priority.INTERACTIVE) -> list[list[float]]:
+        # Split large ingests so each request waits for its own share of the rate limit
+        embeddings = []
+        batch_size = max(settings.embedding_batch_size, 1)
+        for start in range(0, len(texts), batch_size):
+            embeddings.extend(await self._embed_batch(texts[start:start + batch_size], priority))
+        return embeddings
+
+    async def _embed_batch(self, texts: list[str], priority: Priority) -> list[list[float]]:
+        estimated = sum(estimate_tokens(t) for t in texts)
+        charged = await scheduler.acquire(settings.embedding_model, estimated, priority)
         response = await self.client.embeddings.create(
             model=settings.embedding_model,
             input=texts
         )
-        return [item.embedding for item in response.data]
\ No newline at end of file
+        if response.usage is not None:
+            await scheduler.reconcile(settings.embedding_model, charged, response.usage.total_tokens)
+        return [item.embedding for item in response.data]
@@ -0,0 +1,108 @@
+import os
+import hashlib
+import logging
+import tempfile
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Optional
+import httpx
+from app.core.config import settings
+from app.utils.json_store import JsonFileStore
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class RemoteSource:
+    url: str
+    content_hash: str
+    file: Optional[BinaryIO]        # None when the server answered 304 Not Modified
+    not_modified: bool = False      # 304, or the downloaded body hashed to the cached value
+    summary: Optional[Dict] = None  # Ingest summary cached for this content hash, if any
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+class RemoteFetcher:
+    """Streams remote workbooks to a spool file and remembers ETag/Last-Modified per URL."""
+
+    # One pooled client per process; Orchestrator is created per request
+    _client: Optional[httpx.AsyncClient] = None
+
+    def __init__(self):
+        self.cache = JsonFileStore(os.path.join(settings.fetch_cache_dir, "remote_sources.json"))
+
+    @classmethod
+    def _get_client(cls) -> httpx.AsyncClient:
+        if cls._client is None or cls._client.is_closed:
+            cls._client = httpx.AsyncClient(timeout=settings.fetch_timeout, follow_redirects=True)
+        return cls._client
+
+    @classmethod
+    async def aclose(cls):
+        if cls._client is not None:
+            await cls._client.aclose()
+            cls._client = None
+
+    async def fetch(self, url: str, conditional: bool = True) -> RemoteSource:
+        cached = await self._cache_get(url) if conditional else {}
+        headers = {}
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        async with self._get_client().stream("GET", url, headers=headers) as resp:
+            if resp.status_code == 304 and cached.get("content_hash"):
+                logger.info(f"Remote source not modified: {url}")
+                return RemoteSource(url, cached["content_hash"], None, not_modified=True, summary=cached.get("summary"))
+            resp.raise_for_status()
+
+            spool = tempfile.SpooledTemporaryFile(max_size=settings.fetch_spool_max_bytes)
+            digest = hashlib.sha256()
+            try:
+                async for block in resp.aiter_bytes():
+                    digest.update(block)
+                    spool.write(block)
+            except BaseException:
+                spool.close()
+                raise
+            spool.seek(0)
+
+            content_hash = digest.hexdigest()
+            unchanged = content_hash == cached.get("content_hash")
+            await self._cache_put(url, {
+                "etag": resp.headers.get("etag"),
+                "last_modified": resp.headers.get("last-modified"),
+                "content_hash": content_hash,
+                # Validators changed but the bytes did not: the previous summary still applies
+                "summary": cached.get("summary") if unchanged else None
+            })
+
+        return RemoteSource(url, content_hash, spool, not_modified=unchanged, summary=cached.get("summary") if unchanged else None)
+
+    async def record_ingest(self, url: str, content_hash: str, summary: Dict):
+        """Remember what ingesting `content_hash` produced so an unchanged source can skip parsing."""
+        def attach(entry: Dict) -> Dict:
+            if entry.get("content_hash") == content_hash:
+                entry["summary"] = summary
+            return entry or None
+        try:
+            await self.cache.update(url, attach)
+        except Exception:
+            logger.exception(f"Failed to record ingest summary for {url}")
+
+    # The cache is only an optimization: a failed read means an unconditional
+    # fetch, and a failed write means a re-parse next time. Neither fails the query.
+    async def _cache_get(self, url: str) -> Dict:
+        try:
+            return await self.cache.get(url)
+        except Exception:
+            logger.exception(f"Failed to read remote source cache for {url}")
+            return {}
+
+    async def _cache_put(self, url: str, entry: Dict):
+        try:
+            await self.cache.put(url, entry)
+        except Exception:
+            logger.exception(f"Failed to update remote source cache for {url}")
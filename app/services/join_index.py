@@ -0,0 +1,117 @@
+import os
+import asyncio
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+from app.core.config import settings
+from app.models.domain import SheetMetadata, ColumnRole, Relationship
+from app.utils.json_store import read_json, write_json_atomic
+
+# (sheet, column, target_sheet, target_column)
+Link = Tuple[str, str, str, str]
+
+def join_columns(sheet_name: str, roles: Dict[str, ColumnRole], relationships: List[Relationship]) -> Set[str]:
+    """Columns of `sheet_name` whose values are looked up in the join index (stored on row chunks as join_keys)."""
+    cols = {c for c, r in roles.items() if r.foreign_key_to}
+    for rel in relationships:
+        if rel.sheet_a == sheet_name:
+            cols.add(rel.column_a)
+        if rel.sheet_b == sheet_name:
+            cols.add(rel.column_b)
+    return cols
+
+class JoinIndex:
+    """Hash index from a linked column value to the 1-based row numbers holding it in the target sheet."""
+
+    def __init__(self, links: List[Link], rows: Dict[str, Dict[str, Dict[str, List[int]]]]):
+        self.links = links
+        self.rows = rows
+        self._by_sheet: Dict[str, List[Link]] = {}
+        for link in links:
+            self._by_sheet.setdefault(link[0], []).append(link)
+
+    @classmethod
+    def build(cls, metadata: Dict[str, SheetMetadata], data: Dict[str, Dict[str, List]],
+              roles: Dict[str, Dict[str, ColumnRole]], relationships: List[Relationship]) -> "JoinIndex":
+        links: Set[Link] = set()
+        for rel in relationships:
+            links.add((rel.sheet_a, rel.column_a, rel.sheet_b, rel.column_b))
+            links.add((rel.sheet_b, rel.column_b, rel.sheet_a, rel.column_a))
+
+        # foreign_key_to is "Sheet.column"; resolve it against known sheets since both parts may contain dots
+        for sheet, sheet_roles in roles.items():
+            for col, role in sheet_roles.items():
+                if not role.foreign_key_to:
+                    continue
+                for target, meta in metadata.items():
+                    prefix = f"{target}."
+                    target_col = role.foreign_key_to[len(prefix):]
+                    if target != sheet and role.foreign_key_to.startswith(prefix) and any(c.name == target_col for c in meta.columns):
+                        links.add((sheet, col, target, target_col))
+
+        rows: Dict[str, Dict[str, Dict[str, List[int]]]] = {}
+        for _, _, target, target_col in links:
+            if target_col in rows.get(target, {}):
+                continue
+            buckets: Dict[str, List[int]] = {}
+            for i, val in enumerate(data.get(target, {}).get(target_col, [])):
+                if val is not None:
+                    # Row numbers match SemanticChunker's row chunk ids
+                    buckets.setdefault(str(val), []).append(i + 1)
+            rows.setdefault(target, {})[target_col] = buckets
+
+        return cls(sorted(links), rows)
+
+    def lookup(self, sheet_name: str, join_keys: Dict[str, str], per_key_limit: int) -> List[Tuple[str, int]]:
+        """(target_sheet, row_number) pairs joined to a row of `sheet_name` with the given join column values."""
+        matches = []
+        for _, col, target, target_col in self._by_sheet.get(sheet_name, []):
+            val = join_keys.get(col)
+            if val is None:
+                continue
+            for row in self.rows.get(target, {}).get(target_col, {}).get(val, [])[:per_key_limit]:
+                matches.append((target, row))
+        return matches
+
+    def to_dict(self) -> Dict:
+        return {"links": [list(link) for link in self.links], "rows": self.rows}
+
+    @classmethod
+    def from_dict(cls, raw: Dict) -> "JoinIndex":
+        return cls([tuple(link) for link in raw.get("links", [])], raw.get("rows", {}))
+
+class JoinIndexStore:
+    """Persists one join index per workbook next to its vector index."""
+
+    # Parsed indexes shared across requests, LRU-bounded by JOIN_INDEX_CACHE_SIZE
+    _cache: "OrderedDict[str, JoinIndex]" = OrderedDict()
+
+    def _remember(self, workbook_id: str, index: JoinIndex):
+        self._cache[workbook_id] = index
+        self._cache.move_to_end(workbook_id)
+        while len(self._cache) > max(settings.join_index_cache_size, 0):
+            self._cache.popitem(last=False)
+
+    def _path(self, workbook_id: str) -> str:
+        return os.path.join(settings.join_index_dir, f"{workbook_id}.json")
+
+    async def save(self, workbook_id: str, index: JoinIndex):
+        await asyncio.to_thread(write_json_atomic, self._path(workbook_id), index.to_dict())
+        self._remember(workbook_id, index)
+
+    async def load(self, workbook_id: str) -> Optional[JoinIndex]:
+        if workbook_id in self._cache:
+            self._cache.move_to_end(workbook_id)
+            return self._cache[workbook_id]
+        raw = await asyncio.to_thread(read_json, self._path(workbook_id))
+        if raw is None:
+            return None
+        index = JoinIndex.from_dict(raw)
+        self._remember(workbook_id, index)
+        return index
+
+    async def delete(self, workbook_id: str):
+        self._cache.pop(workbook_id, None)
+        try:
+            await asyncio.to_thread(os.remove, self._path(workbook_id))
+        except FileNotFoundError:
+            pass
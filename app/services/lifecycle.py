@@ -0,0 +1,226 @@
+import os
+import time
+import sqlite3
+import asyncio
+import logging
+from contextlib import closing
+from typing import Dict, List, Optional, Set
+from app.core.config import settings
+from app.services.vector_store import VectorStore, LEGACY_PREFIX
+from app.services.join_index import JoinIndexStore
+
+logger = logging.getLogger(__name__)
+
+class IndexRegistry:
+    """SQLite table of workbook indexes. Safe to share between worker processes; every call is a short transaction."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS indexes (
+                workbook_id TEXT PRIMARY KEY,
+                collection_name TEXT NOT NULL,
+                points INTEGER,
+                pinned INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        return conn
+
+    def _row(self, row: sqlite3.Row) -> Dict:
+        entry = dict(row)
+        entry["points"] = entry["points"] or 0
+        entry["pinned"] = bool(entry["pinned"])
+        return entry
+
+    def record_accesses(self, entries: List[Dict]):
+        with closing(self._connect()) as conn, conn:
+            conn.executemany("""
+                INSERT INTO indexes (workbook_id, collection_name, points, created_at, last_access)
+                VALUES (:workbook_id, :collection_name, :points, :last_access, :last_access)
+                ON CONFLICT(workbook_id) DO UPDATE SET
+                    collection_name = excluded.collection_name,
+                    points = COALESCE(excluded.points, indexes.points),
+                    last_access = MAX(indexes.last_access, excluded.last_access)
+            """, [{"points": None, **e} for e in entries])
+
+    def register_missing(self, entries: List[Dict]):
+        with closing(self._connect()) as conn, conn:
+            conn.executemany("""
+                INSERT OR IGNORE INTO indexes (workbook_id, collection_name, points, created_at, last_access)
+                VALUES (:workbook_id, :collection_name, :points, :last_access, :last_access)
+            """, entries)
+
+    def ids(self, with_points: bool = False) -> Set[str]:
+        query = "SELECT workbook_id FROM indexes" + (" WHERE points IS NOT NULL" if with_points else "")
+        with closing(self._connect()) as conn:
+            return {r["workbook_id"] for r in conn.execute(query)}
+
+    def list(self) -> List[Dict]:
+        with closing(self._connect()) as conn:
+            return [self._row(r) for r in conn.execute("SELECT * FROM indexes ORDER BY last_access DESC")]
+
+    def get(self, workbook_id: str) -> Optional[Dict]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM indexes WHERE workbook_id = ?", (workbook_id,)).fetchone()
+        return self._row(row) if row else None
+
+    def set_pinned(self, workbook_id: str, pinned: bool) -> bool:
+        with closing(self._connect()) as conn, conn:
+            cur = conn.execute("UPDATE indexes SET pinned = ? WHERE workbook_id = ?", (int(pinned), workbook_id))
+            return cur.rowcount > 0
+
+    def delete(self, workbook_id: str):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM indexes WHERE workbook_id = ?", (workbook_id,))
+
+class IndexLifecycleManager:
+    """Tracks last access and size per workbook index and evicts LRU indexes past the TTL or point quota."""
+
+    # Accesses buffered in memory per process and written to the registry by flush(),
+    # so the query path never does registry I/O
+    _pending: Dict[str, Dict] = {}
+
+    def __init__(self, vector_store: Optional[VectorStore] = None):
+        self.vector_store = vector_store or VectorStore()
+        self.registry = IndexRegistry(os.path.join(settings.lifecycle_state_dir, "indexes.db"))
+
+    def _key(self, file_hash: str) -> str:
+        return self.vector_store._workbook_id(file_hash)
+
+    async def touch(self, file_hash: str, points: Optional[int] = None):
+        """Record an access. Pass `points` after an ingest. Never raises: bookkeeping must not fail a query."""
+        try:
+            key = self._key(file_hash)
+            entry = self._pending.setdefault(key, {"workbook_id": key})
+            entry["collection_name"] = self.vector_store._collection_name(file_hash)
+            entry["last_access"] = time.time()
+            if points is not None:
+                entry["points"] = points
+        except Exception:
+            logger.exception(f"Failed to record access for workbook {file_hash[:16]}")
+
+    async def flush(self):
+        """Write buffered accesses to the registry, looking up sizes that were never recorded."""
+        pending, IndexLifecycleManager._pending = IndexLifecycleManager._pending, {}
+        if not pending:
+            return
+        try:
+            unsized = [k for k, e in pending.items() if e.get("points") is None]
+            if unsized:
+                sized = await asyncio.to_thread(self.registry.ids, True)
+                for key in unsized:
+                    if key not in sized:
+                        pending[key]["points"] = await self.vector_store.count_points(key)
+            await asyncio.to_thread(self.registry.record_accesses, list(pending.values()))
+        except Exception:
+            logger.exception("Failed to flush index accesses")
+            # Keep the entries for the next flush unless newer accesses replaced them
+            for key, entry in pending.items():
+                self._pending.setdefault(key, entry)
+
+    async def reconcile(self) -> int:
+        """Register indexes that exist in Qdrant but not in the registry (e.g. created before this manager existed)."""
+        known = await asyncio.to_thread(self.registry.ids)
+        collections = [c.name for c in (await self.vector_store.client.get_collections()).collections]
+        shared_prefix = settings.shared_collection_name
+        now = time.time()
+        missing = []
+
+        if self.vector_store.shared:
+            for name in collections:
+                if not name.startswith(shared_prefix):
+                    continue
+                facets = await self.vector_store.client.facet(collection_name=name, key="workbook_id", limit=1_000_000, exact=True)
+                for hit in facets.hits:
+                    if hit.value not in known:
+                        missing.append({"workbook_id": hit.value, "collection_name": name, "points": hit.count, "last_access": now})
+        else:
+            for name in collections:
+                if not name.startswith(LEGACY_PREFIX) or name.startswith(shared_prefix):
+                    continue
+                key = name[len(LEGACY_PREFIX):]
+                if key not in known:
+                    points = await self.vector_store.count_points(key)
+                    # Real age is unknown, so treat the index as accessed now
+                    missing.append({"workbook_id": key, "collection_name": name, "points": points, "last_access": now})
+
+        if missing:
+            await asyncio.to_thread(self.registry.register_missing, missing)
+            logger.info(f"Registered {len(missing)} untracked workbook index(es)")
+        return len(missing)
+
+    async def list_indexes(self) -> List[Dict]:
+        await self.flush()
+        return await asyncio.to_thread(self.registry.list)
+
+    async def set_pinned(self, workbook_id: str, pinned: bool) -> Dict:
+        await self.flush()
+        if not await asyncio.to_thread(self.registry.set_pinned, workbook_id, pinned):
+            raise KeyError(workbook_id)
+        return await asyncio.to_thread(self.registry.get, workbook_id)
+
+    async def purge(self, workbook_id: str):
+        """Delete the index and forget it. The next query for the workbook re-ingests from scratch."""
+        await self.vector_store.delete_workbook(workbook_id)
+        await JoinIndexStore().delete(workbook_id)
+        await asyncio.to_thread(self.registry.delete, workbook_id)
+        self._pending.pop(workbook_id, None)
+        logger.info(f"Purged index for workbook {workbook_id}")
+
+    def select_evictions(self, entries: List[Dict], now: float) -> List[str]:
+        """Pick unpinned workbooks to drop: everything past the TTL, then LRU until under the point quota."""
+        candidates = sorted((e for e in entries if not e.get("pinned")), key=lambda e: e.get("last_access", 0))
+        evict = []
+
+        if settings.index_ttl_seconds > 0:
+            cutoff = now - settings.index_ttl_seconds
+            evict = [e["workbook_id"] for e in candidates if e.get("last_access", 0) < cutoff]
+
+        if settings.index_max_points > 0:
+            total = sum(e.get("points", 0) for e in entries if e["workbook_id"] not in evict)
+            for e in candidates:
+                if total <= settings.index_max_points:
+                    break
+                if e["workbook_id"] not in evict:
+                    evict.append(e["workbook_id"])
+                    total -= e.get("points", 0)
+        return evict
+
+    async def evict(self) -> List[str]:
+        await self.flush()
+        await self.reconcile()
+        entries = await asyncio.to_thread(self.registry.list)
+        evicted = self.select_evictions(entries, time.time())
+        for workbook_id in evicted:
+            try:
+                await self.purge(workbook_id)
+            except Exception:
+                logger.exception(f"Failed to evict workbook {workbook_id}")
+        return evicted
+
+    async def run_forever(self):
+        """Background loop started from the app lifespan: flush accesses often, evict less often."""
+        last_eviction = time.monotonic()
+        while True:
+            await asyncio.sleep(max(settings.lifecycle_flush_seconds, 1))
+            await self.flush()
+            if time.monotonic() - last_eviction < settings.eviction_interval_seconds:
+                continue
+            last_eviction = time.monotonic()
+            try:
+                evicted = await self.evict()
+                if evicted:
+                    logger.info(f"Evicted {len(evicted)} workbook index(es)")
+            except Exception:
+                logger.exception("Index eviction pass failed")
+
+    async def close(self):
+        await self.vector_store.close()
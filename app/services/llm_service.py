@@ -1,15 +1,21 @@
 from openai import AsyncOpenAI
 from app.core.config import settings
+from app.services.rate_limiter import Priority, estimate_tokens, scheduler
 
 class LLMService:
     def __init__(self):
         self.client = AsyncOpenAI(api_key=settings.openai_api_key)
 
-    async def generate_answer(self, query: str, context: str) -> str:
+    async def generate_answer(self, query: str, context: str, priority: Priority = Priority.INTERACTIVE) -> str:
         prompt = f"Context from Excel:\n{context}\n\nQuestion: {query}\n\nAnswer based on context:"
+        max_tokens = 1000
+        estimated = estimate_tokens(prompt) + max_tokens
+        charged = await scheduler.acquire(settings.llm_model, estimated, priority)
         response = await self.client.chat.completions.create(
             model=settings.llm_model,
             messages=[{"role": "user", "content": prompt}],
-            max_tokens=1000
+            max_tokens=max_tokens
         )
-        return response.choices[0].message.content
\ No newline at end of file
+        if response.usage is not None:
+            await scheduler.reconcile(settings.llm_model, charged, response.usage.total_tokens)
+        return response.choices[0].message.content
@@ -1,12 +1,19 @@
+import asyncio
 import hashlib
-import httpx
 import logging
+from typing import BinaryIO, Union
+from app.core.config import settings
+from app.models.domain import Relationship
+from app.services.fetcher import RemoteFetcher
 from app.services.parser import ExcelParser
 from app.services.analyzer import SchemaAnalyzer
 from app.services.chunker import SemanticChunker
 from app.services.embedder import Embedder
+from app.services.rate_limiter import Priority
 from app.services.vector_store import VectorStore
 from app.services.llm_service import LLMService
+from app.services.lifecycle import IndexLifecycleManager
+from app.services.join_index import JoinIndex, JoinIndexStore
 
 logger = logging.getLogger(__name__)
 
@@ -18,36 +25,46 @@ class Orchestrator:
         self.embedder = Embedder()
         self.vector_store = VectorStore()
         self.llm = LLMService()
+        self.fetcher = RemoteFetcher()
+        self.lifecycle = IndexLifecycleManager(self.vector_store)
+        self.join_indexes = JoinIndexStore()
 
-    async def process_and_query(self, file_url: str, query: str, top_k: int, sheet_filter: str = None, type_filter: str = None):
-        # 1. Get File
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(file_url)
-            file_bytes = resp.content
-        
-        # file_hash = hashlib.sha256(file_bytes).hexdigest()
-        file_hash = "sample_poc_collection"
-        # 2. Parse
-        metadata = await self.parser.parse_bytes(file_bytes)
-        data = self.parser.extract_data(metadata, file_bytes)
+    async def process_and_query(self, file_url: str, query: str, top_k: int, sheet_filter: str = None, type_filter: str = None, expand_joins: bool = False):
+        # 1. Get File (conditional request; 304 or identical bytes skip parse and ingest)
+        source = await self.fetcher.fetch(file_url)
+        try:
+            file_hash = source.content_hash
+            summary = source.summary
+            if summary is not None and expand_joins and await self.join_indexes.load(self.vector_store._workbook_id(file_hash)) is None:
+                # Indexed but the join index is gone (e.g. JOIN_INDEX_DIR wiped): re-parse so _ingest_source rebuilds it
+                logger.info(f"Join index missing for workbook {file_hash[:8]}. Re-parsing to rebuild it.")
+                summary = None
+            if summary is None or not await self.vector_store.has_workbook(file_hash):
+                if source.file is None:
+                    # Server says unchanged but an index is gone: fetch the body unconditionally
+                    source = await self.fetcher.fetch(file_url, conditional=False)
+                    file_hash = source.content_hash
 
-        # 3. Analyze
-        relationships = self.analyzer.detect_relationships(metadata, data)
-        roles = {sheet: self.analyzer.detect_roles(meta, data[sheet], relationships) for sheet, meta in metadata.items()}
-
-        # 4. Chunk
-        chunks = self.chunker.build_chunks(metadata, data, roles, relationships)
-
-        # 5. Store (Check if exists)
-        is_new = await self.vector_store.ensure_collection(file_hash)
-        if is_new:
-            embeddings = await self.embedder.embed([c.content for c in chunks])
-            await self.vector_store.upsert(file_hash, chunks, embeddings)
+                # 2-5. Parse, analyze, chunk and store
+                _, metadata, chunks, relationships = await self._ingest_source(source.file, file_hash)
+                summary = {
+                    "chunks_indexed": len(chunks),
+                    "sheets": list(metadata.keys()),
+                    "relationships": [r.model_dump() for r in relationships]
+                }
+                await self.fetcher.record_ingest(file_url, file_hash, summary)
+            else:
+                logger.info(f"Remote workbook unchanged (Hash: {file_hash[:8]}). Skipping ingest.")
+                await self.lifecycle.touch(file_hash)
+        finally:
+            source.close()
 
         # 6. Retrieve
         query_vec = (await self.embedder.embed([query]))[0]
         filters = {"sheet_name": sheet_filter, "chunk_type": type_filter}
         results = await self.vector_store.search(file_hash, query_vec, top_k, filters)
+        if expand_joins:
+            results = (await self._expand_joins(file_hash, [results]))[0]
 
         # 7. Generate
         context = "\n\n".join([r["content"] for r in results])
@@ -58,20 +75,22 @@ class Orchestrator:
         return {
             "answer": answer,
             "collection_name": self.vector_store._collection_name(file_hash),
-            "chunks_indexed": len(chunks),
+            "chunks_indexed": summary["chunks_indexed"],
             "matches": results[:5],
-            "sheets": list(metadata.keys()),
-            "relationships": relationships
+            "sheets": summary["sheets"],
+            "relationships": [Relationship(**r) for r in summary["relationships"]]
         }
-    
 
-    async def process_query_from_bytes(self, file_bytes: bytes, query: str, top_k: int, sheet_filter: str = None):
+    async def _ingest_bytes(self, file_bytes: bytes):
+        """Parse, analyze, chunk and (if unseen) index a workbook. Shared by the single and batch query paths."""
         # 1. Hash
         file_hash = hashlib.sha256(file_bytes).hexdigest()
+        return await self._ingest_source(file_bytes, file_hash)
 
+    async def _ingest_source(self, source: Union[bytes, BinaryIO], file_hash: str):
         # 2. Parse (NOW ASYNC)
-        metadata = await self.parser.parse_bytes(file_bytes)
-        data = await self.parser.extract_data(metadata, file_bytes)
+        metadata = await self.parser.parse_bytes(source)
+        data = await self.parser.extract_data(metadata, source)
 
         # 3. Analyze
         relationships = self.analyzer.detect_relationships(metadata, data)
@@ -83,13 +102,29 @@ class Orchestrator:
         # 5. Store
         is_new = await self.vector_store.ensure_collection(file_hash)
         if is_new:
-            embeddings = await self.embedder.embed([c.content for c in chunks])
+            embeddings = await self.embedder.embed([c.content for c in chunks], priority=Priority.BULK)
             await self.vector_store.upsert(file_hash, chunks, embeddings)
+            await self.lifecycle.touch(file_hash, points=len(chunks))
+        else:
+            await self.lifecycle.touch(file_hash)
+
+        # Also rebuild a missing index (e.g. cache dir wiped) for a workbook that is already indexed.
+        # Expansion still needs points written by this version (join_keys payload, deterministic ids).
+        workbook_id = self.vector_store._workbook_id(file_hash)
+        if is_new or await self.join_indexes.load(workbook_id) is None:
+            await self.join_indexes.save(workbook_id, JoinIndex.build(metadata, data, roles, relationships))
+
+        return file_hash, metadata, chunks, relationships
+
+    async def process_query_from_bytes(self, file_bytes: bytes, query: str, top_k: int, sheet_filter: str = None, expand_joins: bool = False):
+        file_hash, metadata, chunks, relationships = await self._ingest_bytes(file_bytes)
 
         # 6. Retrieve
         query_vec = (await self.embedder.embed([query]))[0]
         filters = {"sheet_name": sheet_filter}
         results = await self.vector_store.search(file_hash, query_vec, top_k, filters)
+        if expand_joins:
+            results = (await self._expand_joins(file_hash, [results]))[0]
 
         # 7. Generate
         context = "\n\n".join([r["content"] for r in results])
@@ -105,7 +140,113 @@ class Orchestrator:
             "sheets": list(metadata.keys()),
             "relationships": relationships
         }
-    
+
+    async def _expand_joins(self, file_hash: str, result_lists: list[list[dict]]) -> list[list[dict]]:
+        """Append rows linked to each matched row via the workbook's join index, fetched in one retrieve call."""
+        join_index = await self.join_indexes.load(self.vector_store._workbook_id(file_hash))
+        if join_index is None:
+            return result_lists
+
+        plans = []
+        for results in result_lists:
+            seen = {(r["sheet_name"], r.get("row_index")) for r in results if r["chunk_type"] == "row_semantic"}
+            wanted = []
+            for r in results:
+                if r["chunk_type"] != "row_semantic":
+                    continue
+                for sheet, row in join_index.lookup(r["sheet_name"], r.get("join_keys") or {}, settings.join_max_rows_per_key):
+                    if (sheet, row) not in seen and len(wanted) < settings.join_max_expanded_rows:
+                        seen.add((sheet, row))
+                        wanted.append((f"row_{sheet}_{row}", r["score"]))
+            plans.append(wanted)
+
+        chunk_ids = {cid for wanted in plans for cid, _ in wanted}
+        if not chunk_ids:
+            return result_lists
+        fetched = await self.vector_store.retrieve_chunks(file_hash, list(chunk_ids))
+
+        expanded = []
+        for results, wanted in zip(result_lists, plans):
+            joined = [
+                {**fetched[cid], "chunk_type": "joined_row", "score": score}
+                for cid, score in wanted if cid in fetched
+            ]
+            expanded.append(results + joined)
+        return expanded
+
+    @staticmethod
+    def validate_batch(queries: list[str]):
+        if not queries:
+            raise ValueError("At least one question is required.")
+        if len(queries) > settings.batch_max_questions:
+            raise ValueError(f"Too many questions: {len(queries)} (max {settings.batch_max_questions}).")
+
+    async def prepare_batch(self, file_bytes: bytes, queries: list[str], top_k: int, sheet_filter: str = None, expand_joins: bool = False):
+        """Validate, ingest and search for every question. Closes the vector store if anything fails."""
+        try:
+            return await self._prepare_batch(file_bytes, queries, top_k, sheet_filter, expand_joins)
+        except BaseException:
+            await self.vector_store.close()
+            raise
+
+    async def _prepare_batch(self, file_bytes: bytes, queries: list[str], top_k: int, sheet_filter: str = None, expand_joins: bool = False):
+        self.validate_batch(queries)
+
+        file_hash, metadata, chunks, relationships = await self._ingest_bytes(file_bytes)
+
+        # One embedding request and one Qdrant round trip for every question
+        query_vecs = await self.embedder.embed(queries)
+        filters = {"sheet_name": sheet_filter}
+        results = await self.vector_store.search_batch(file_hash, query_vecs, top_k, filters)
+        if expand_joins:
+            results = await self._expand_joins(file_hash, results)
+
+        summary = {
+            "collection_name": self.vector_store._collection_name(file_hash),
+            "chunks_indexed": len(chunks),
+            "sheets": list(metadata.keys()),
+            "relationships": relationships
+        }
+        return summary, results
+
+    def _answer_tasks(self, queries: list[str], results: list[list[dict]]) -> list[asyncio.Task]:
+        semaphore = asyncio.Semaphore(max(settings.llm_max_concurrency, 1))
+
+        async def answer(index: int, query: str, matches: list[dict]) -> dict:
+            context = "\n\n".join([m["content"] for m in matches])
+            async with semaphore:
+                try:
+                    answer_text, error = await self.llm.generate_answer(query, context), None
+                except Exception as e:
+                    logger.exception(f"Batch question {index} failed")
+                    answer_text, error = "", str(e)
+            return {"index": index, "query": query, "answer": answer_text, "matches": matches[:5], "error": error}
+
+        return [asyncio.create_task(answer(i, q, r)) for i, (q, r) in enumerate(zip(queries, results))]
+
+    async def batch_query_from_bytes(self, file_bytes: bytes, queries: list[str], top_k: int, sheet_filter: str = None, expand_joins: bool = False):
+        """Answer a list of questions against one workbook, amortizing embedding, search and LLM calls."""
+        try:
+            summary, results = await self._prepare_batch(file_bytes, queries, top_k, sheet_filter, expand_joins)
+            answers = await asyncio.gather(*self._answer_tasks(queries, results))
+        finally:
+            await self.vector_store.close()
+        return {**summary, "results": list(answers)}
+
+    async def stream_batch_answers(self, queries: list[str], summary: dict, results: list[list[dict]]):
+        """Streaming counterpart of batch_query_from_bytes, run on the output of prepare_batch.
+        Yields the summary first, then each answer as soon as it finishes."""
+        tasks = []
+        try:
+            yield {"event": "summary", **summary}
+            tasks = self._answer_tasks(queries, results)
+            for finished in asyncio.as_completed(tasks):
+                yield {"event": "result", **(await finished)}
+        finally:
+            for task in tasks:
+                task.cancel()
+            await self.vector_store.close()
+
     # async def process_query_from_bytes(self, file_bytes: bytes, query: str, top_k: int, sheet_filter: str = None):
     #     """Process file bytes directly instead of fetching from URL."""
     #     # 1. Hash
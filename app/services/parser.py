@@ -2,24 +2,24 @@ import io
 import asyncio
 import openpyxl
 import zipfile
-from typing import Dict, List
+from typing import BinaryIO, Dict, List, Union
 from app.models.domain import SheetMetadata, ColumnMetadata
 
 class ExcelParser:
     # 1. Public async method to be called by Orchestrator
-    async def parse_bytes(self, file_bytes: bytes) -> Dict[str, SheetMetadata]:
+    async def parse_bytes(self, file_bytes: Union[bytes, BinaryIO]) -> Dict[str, SheetMetadata]:
         """Parse Excel file asynchronously by offloading to a thread."""
         return await asyncio.to_thread(self._parse_sync, file_bytes)
 
     # 2. Public async method for data extraction
-    async def extract_data(self, metadata: Dict[str, SheetMetadata], file_bytes: bytes) -> Dict[str, Dict[str, List]]:
+    async def extract_data(self, metadata: Dict[str, SheetMetadata], file_bytes: Union[bytes, BinaryIO]) -> Dict[str, Dict[str, List]]:
         """Extract data asynchronously."""
         return await asyncio.to_thread(self._extract_data_sync, metadata, file_bytes)
 
     # 3. Internal synchronous logic (The Heavy Lifting)
-    def _parse_sync(self, file_bytes: bytes) -> Dict[str, SheetMetadata]:
+    def _parse_sync(self, file_bytes: Union[bytes, BinaryIO]) -> Dict[str, SheetMetadata]:
         try:
-            wb = openpyxl.load_workbook(io.BytesIO(file_bytes), data_only=True)
+            wb = self._load_workbook(file_bytes)
         except zipfile.BadZipFile:
             raise ValueError("Invalid file format. Please upload a valid .xlsx file.")
         except Exception as e:
@@ -34,8 +34,8 @@ class ExcelParser:
             all_metadata[sheet_name] = meta
         return all_metadata
 
-    def _extract_data_sync(self, metadata: Dict[str, SheetMetadata], file_bytes: bytes) -> Dict[str, Dict[str, List]]:
-        wb = openpyxl.load_workbook(io.BytesIO(file_bytes), data_only=True)
+    def _extract_data_sync(self, metadata: Dict[str, SheetMetadata], file_bytes: Union[bytes, BinaryIO]) -> Dict[str, Dict[str, List]]:
+        wb = self._load_workbook(file_bytes)
         data = {}
         for sheet_name, meta in metadata.items():
             sheet = wb[sheet_name]
@@ -50,6 +50,14 @@ class ExcelParser:
         return data
 
     # Helper methods remain synchronous
+    def _load_workbook(self, source: Union[bytes, BinaryIO]):
+        # Accept raw bytes or a seekable file (e.g. a spooled download) without copying it into memory
+        if isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+        else:
+            source.seek(0)
+        return openpyxl.load_workbook(source, data_only=True)
+
     def _extract_sheet_metadata(self, sheet) -> SheetMetadata:
         header_row = self._detect_header_row(sheet)
         columns = []
@@ -0,0 +1,124 @@
+import time
+import heapq
+import asyncio
+import itertools
+from enum import IntEnum
+from typing import Dict, Tuple
+from app.core.config import settings
+
+class Priority(IntEnum):
+    # Lower value is served first
+    INTERACTIVE = 0
+    BULK = 10
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English text; reconciled with reported usage afterwards
+    return max(1, len(text) // 4)
+
+class TokenBucket:
+    """Continuously refilling bucket holding at most `per_minute` units. A limit of 0 means unlimited."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def clamp(self, amount: float) -> float:
+        # A single request larger than the whole bucket would otherwise wait forever
+        return min(amount, self.capacity)
+
+    def time_until(self, amount: float) -> float:
+        if self.unlimited:
+            return 0.0
+        self._refill()
+        deficit = self.clamp(amount) - self.level
+        return max(0.0, deficit / self.rate)
+
+    def consume(self, amount: float) -> float:
+        """Take capacity and return how much was actually charged (clamped to the bucket size)."""
+        if self.unlimited:
+            return amount
+        self._refill()
+        charged = self.clamp(amount)
+        self.level -= charged
+        return charged
+
+    def refund(self, amount: float):
+        """Give back (or, if negative, charge) the difference between charged and actual usage."""
+        if not self.unlimited:
+            self._refill()
+            self.level = min(self.capacity, self.level + amount)
+
+class ModelLimiter:
+    """Requests- and tokens-per-minute buckets for one model, granting capacity to waiters in priority order."""
+
+    def __init__(self, rpm: int, tpm: int):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._waiters = []
+        self._seq = itertools.count()
+        self._cond = asyncio.Condition()
+
+    async def acquire(self, tokens: int, priority: Priority) -> float:
+        entry = (int(priority), next(self._seq))
+        async with self._cond:
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    timeout = None
+                    if self._waiters[0] == entry:
+                        timeout = max(self.requests.time_until(1), self.tokens.time_until(tokens))
+                        if timeout <= 0:
+                            self.requests.consume(1)
+                            return self.tokens.consume(tokens)
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+    async def reconcile(self, charged: float, actual: int):
+        async with self._cond:
+            self.tokens.refund(charged - actual)
+            self._cond.notify_all()
+
+class RateLimitScheduler:
+    """Process-wide gate in front of OpenAI calls so bulk ingestion cannot starve interactive queries."""
+
+    def __init__(self):
+        self._limiters: Dict[str, ModelLimiter] = {}
+
+    def _limits(self, model: str) -> Tuple[int, int]:
+        if model == settings.embedding_model:
+            return settings.embedding_rpm, settings.embedding_tpm
+        if model == settings.llm_model:
+            return settings.llm_rpm, settings.llm_tpm
+        return 0, 0
+
+    def limiter(self, model: str) -> ModelLimiter:
+        if model not in self._limiters:
+            self._limiters[model] = ModelLimiter(*self._limits(model))
+        return self._limiters[model]
+
+    async def acquire(self, model: str, tokens: int, priority: Priority = Priority.INTERACTIVE) -> float:
+        """Wait until `model` has room for one request of roughly `tokens` tokens. Returns the tokens charged."""
+        return await self.limiter(model).acquire(tokens, priority)
+
+    async def reconcile(self, model: str, charged: float, actual: int):
+        """Settle a call: `charged` is what acquire() returned, `actual` the usage the API reported."""
+        await self.limiter(model).reconcile(charged, actual)
+
+scheduler = RateLimitScheduler()
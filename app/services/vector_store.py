@@ -1,59 +1,245 @@
 import uuid
+import zlib
+import logging
 from qdrant_client import AsyncQdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue
+from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue, PayloadSchemaType, KeywordIndexParams, QueryRequest
 from app.core.config import settings
 from app.models.domain import Chunk
 
+logger = logging.getLogger(__name__)
+
+LEGACY_PREFIX = "excel_rag_"
+
 class VectorStore:
+    # Payload fields indexed in shared collections; workbook_id is the tenant key
+    INDEXED_FIELDS = {
+        "workbook_id": KeywordIndexParams(type="keyword", is_tenant=True),
+        "sheet_name": PayloadSchemaType.KEYWORD,
+        "chunk_type": PayloadSchemaType.KEYWORD,
+        "primary_key": PayloadSchemaType.KEYWORD,
+    }
+
     def __init__(self):
         self.client = AsyncQdrantClient(url=settings.qdrant_url, api_key=settings.qdrant_api_key)
+        self.shared = settings.storage_mode == "shared"
+        self._known_collections = set()
+
+    def _workbook_id(self, file_hash: str) -> str:
+        return file_hash[:16]
 
     def _collection_name(self, file_hash: str) -> str:
-        return f"excel_rag_{file_hash[:16]}"
+        if self.shared:
+            return self._shard_name(self._workbook_id(file_hash))
+        return f"{LEGACY_PREFIX}{self._workbook_id(file_hash)}"
+
+    def _shard_name(self, workbook_id: str) -> str:
+        shards = max(settings.shared_collection_shards, 1)
+        if shards == 1:
+            return settings.shared_collection_name
+        # Stable across processes, unlike hash()
+        return f"{settings.shared_collection_name}_{zlib.crc32(workbook_id.encode()) % shards}"
+
+    def point_id(self, file_hash: str, chunk_id: str) -> str:
+        # Deterministic, so a chunk can be fetched by id (e.g. join expansion) without a search
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{self._workbook_id(file_hash)}/{chunk_id}"))
+
+    def _workbook_filter(self, file_hash: str) -> FieldCondition:
+        return FieldCondition(key="workbook_id", match=MatchValue(value=self._workbook_id(file_hash)))
 
     async def ensure_collection(self, file_hash: str) -> bool:
+        """Create the backing collection if needed. Returns True when the workbook still has to be ingested."""
         name = self._collection_name(file_hash)
-        collections = await self.client.get_collections()
-        if name in [c.name for c in collections.collections]:
-            return False
-        
+        if not self.shared:
+            if await self.client.collection_exists(name):
+                return False
+            await self._create_collection(name)
+            return True
+
+        await self._ensure_shared_collection(name)
+        # Exact count: an estimate could skip ingesting a workbook that has no points.
+        # It stays cheap because of the tenant index on workbook_id.
+        result = await self.client.count(
+            collection_name=name,
+            count_filter=Filter(must=[self._workbook_filter(file_hash)]),
+            exact=True
+        )
+        return result.count == 0
+
+    async def has_workbook(self, file_hash: str) -> bool:
+        """Read-only counterpart of ensure_collection: True when the workbook is already indexed."""
+        return await self.count_points(file_hash, exact=True) > 0
+
+    async def count_points(self, file_hash: str, exact: bool = False) -> int:
+        """Point count for a workbook. The default estimate is fine for display; pass exact=True for existence checks."""
+        name = self._collection_name(file_hash)
+        if not await self.client.collection_exists(name):
+            return 0
+        result = await self.client.count(
+            collection_name=name,
+            count_filter=Filter(must=[self._workbook_filter(file_hash)]) if self.shared else None,
+            exact=exact
+        )
+        return result.count
+
+    async def delete_workbook(self, file_hash: str):
+        """Drop a workbook's index: the whole collection in per_file mode, its points in shared mode."""
+        name = self._collection_name(file_hash)
+        if not await self.client.collection_exists(name):
+            return
+        if not self.shared:
+            await self.client.delete_collection(name)
+            return
+        await self.client.delete(
+            collection_name=name,
+            points_selector=Filter(must=[self._workbook_filter(file_hash)])
+        )
+
+    async def _create_collection(self, name: str):
         await self.client.create_collection(
             collection_name=name,
             vectors_config=VectorParams(size=settings.embedding_dim, distance=Distance.COSINE)
         )
-        return True
+
+    async def _ensure_shared_collection(self, name: str):
+        if name in self._known_collections:
+            return
+        if not await self.client.collection_exists(name):
+            await self._create_collection(name)
+            for field, schema in self.INDEXED_FIELDS.items():
+                await self.client.create_payload_index(collection_name=name, field_name=field, field_schema=schema)
+        self._known_collections.add(name)
+
+    def _payload(self, file_hash: str, chunk: Chunk) -> dict:
+        payload = {"content": chunk.content, **chunk.payload, "chunk_type": chunk.chunk_type, "sheet_name": chunk.sheet_name}
+        if self.shared:
+            payload["workbook_id"] = self._workbook_id(file_hash)
+            # Keyword index only covers strings; keep numeric ids matchable
+            if payload.get("primary_key") is not None:
+                payload["primary_key"] = str(payload["primary_key"])
+        return payload
 
     async def upsert(self, file_hash: str, chunks: list[Chunk], embeddings: list[list[float]]):
         name = self._collection_name(file_hash)
         points = [
             PointStruct(
-                id=str(uuid.uuid4()),
+                id=self.point_id(file_hash, c.chunk_id),
                 vector=emb,
-                payload={"content": c.content, **c.payload, "chunk_type": c.chunk_type, "sheet_name": c.sheet_name}
+                payload=self._payload(file_hash, c)
             )
             for c, emb in zip(chunks, embeddings)
         ]
         await self.client.upsert(collection_name=name, points=points)
 
-    async def search(self, file_hash: str, query_vector: list[float], top_k: int, filters: dict = None):
-        name = self._collection_name(file_hash)
+    def _build_filter(self, file_hash: str, filters: dict = None):
+        filters = filters or {}
         must_conditions = []
-        
+
+        if self.shared:
+            must_conditions.append(self._workbook_filter(file_hash))
         if filters.get("sheet_name"):
             must_conditions.append(FieldCondition(key="sheet_name", match=MatchValue(value=filters["sheet_name"])))
         if filters.get("chunk_type"):
             must_conditions.append(FieldCondition(key="chunk_type", match=MatchValue(value=filters["chunk_type"])))
 
-        query_filter = Filter(must=must_conditions) if must_conditions else None
-        
+        return Filter(must=must_conditions) if must_conditions else None
+
+    async def search(self, file_hash: str, query_vector: list[float], top_k: int, filters: dict = None):
+        name = self._collection_name(file_hash)
         results = await self.client.query_points(
             collection_name=name,
             query=query_vector,
-            query_filter=query_filter,
+            query_filter=self._build_filter(file_hash, filters),
             limit=top_k,
             with_payload=True
         )
-        return [{"content": p.payload["content"], "score": p.score, "chunk_type": p.payload["chunk_type"], "sheet_name": p.payload["sheet_name"]} for p in results.points]
+        return [self._to_match(p) for p in results.points]
+
+    async def search_batch(self, file_hash: str, query_vectors: list[list[float]], top_k: int, filters: dict = None):
+        """Run several searches against one workbook in a single query_batch_points round trip."""
+        name = self._collection_name(file_hash)
+        query_filter = self._build_filter(file_hash, filters)
+        requests = [
+            QueryRequest(query=vec, filter=query_filter, limit=top_k, with_payload=True)
+            for vec in query_vectors
+        ]
+        responses = await self.client.query_batch_points(collection_name=name, requests=requests)
+        return [[self._to_match(p) for p in r.points] for r in responses]
+
+    async def retrieve_chunks(self, file_hash: str, chunk_ids: list[str]) -> dict[str, dict]:
+        """Fetch chunks by id in one call, keyed by chunk id. Missing ids are skipped."""
+        if not chunk_ids:
+            return {}
+        ids = {self.point_id(file_hash, cid): cid for cid in chunk_ids}
+        records = await self.client.retrieve(
+            collection_name=self._collection_name(file_hash),
+            ids=list(ids),
+            with_payload=True
+        )
+        return {ids[str(r.id)]: self._to_match(r) for r in records}
+
+    def _to_match(self, point) -> dict:
+        return {
+            "content": point.payload["content"],
+            "score": getattr(point, "score", 0.0),
+            "chunk_type": point.payload["chunk_type"],
+            "sheet_name": point.payload["sheet_name"],
+            "row_index": point.payload.get("row_index"),
+            "join_keys": point.payload.get("join_keys") or {}
+        }
+
+    async def migrate_legacy_collections(self, delete_source: bool = False, batch_size: int = 256) -> dict[str, int]:
+        """Copy every per-file `excel_rag_<hash>` collection into the shared collection(s)."""
+        if not self.shared:
+            raise ValueError("Migration requires STORAGE_MODE=shared")
+
+        shared_prefix = settings.shared_collection_name
+        collections = await self.client.get_collections()
+        legacy = [
+            c.name for c in collections.collections
+            if c.name.startswith(LEGACY_PREFIX) and not c.name.startswith(shared_prefix)
+        ]
+
+        migrated = {}
+        for source in legacy:
+            workbook_id = source[len(LEGACY_PREFIX):]
+            migrated[source] = await self._migrate_collection(source, workbook_id, batch_size)
+            if delete_source:
+                await self.client.delete_collection(source)
+            logger.info(f"Migrated {migrated[source]} points from {source}")
+        return migrated
+
+    async def _migrate_collection(self, source: str, workbook_id: str, batch_size: int) -> int:
+        target = self._shard_name(workbook_id)
+        await self._ensure_shared_collection(target)
+
+        # Re-running is safe: clear any partial copy first
+        await self.client.delete(
+            collection_name=target,
+            points_selector=Filter(must=[FieldCondition(key="workbook_id", match=MatchValue(value=workbook_id))])
+        )
+
+        total = 0
+        offset = None
+        while True:
+            records, offset = await self.client.scroll(
+                collection_name=source,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True
+            )
+            if records:
+                points = []
+                for r in records:
+                    payload = {**r.payload, "workbook_id": workbook_id}
+                    if payload.get("primary_key") is not None:
+                        payload["primary_key"] = str(payload["primary_key"])
+                    points.append(PointStruct(id=r.id, vector=r.vector, payload=payload))
+                await self.client.upsert(collection_name=target, points=points)
+                total += len(points)
+            if offset is None:
+                break
+        return total
 
     async def close(self):
-        await self.client.close()
\ No newline at end of file
+        await self.client.close()
@@ -0,0 +1,89 @@
+import os
+import json
+import asyncio
+import tempfile
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+_locks: Dict[str, asyncio.Lock] = {}
+
+def read_json(path: str, default=None):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return default
+
+def write_json_atomic(path: str, data):
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    # Write-then-rename so a crash never leaves a truncated file behind; the temp
+    # name is unique so concurrent writers (other workers) never share it
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, default=str)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+@contextmanager
+def file_lock(path: str):
+    """Exclusive advisory lock on `<path>.lock`, shared by every process using the same path."""
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(f"{path}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+class JsonFileStore:
+    """Small dict-of-dicts persisted as one JSON file. Updates are serialized across tasks and processes and written atomically."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = _locks.setdefault(os.path.abspath(path), asyncio.Lock())
+
+    async def read(self) -> Dict[str, Dict]:
+        async with self._lock:
+            return await asyncio.to_thread(self._load)
+
+    async def get(self, key: str) -> Dict:
+        return (await self.read()).get(key, {})
+
+    async def put(self, key: str, entry: Dict):
+        await self.update(key, lambda _: entry)
+
+    async def update(self, key: str, fn: Callable[[Dict], Optional[Dict]]):
+        """Read-modify-write a single entry under the lock. Returning None from `fn` deletes the key."""
+        async with self._lock:
+            await asyncio.to_thread(self._apply, key, fn)
+
+    async def delete(self, key: str):
+        await self.update(key, lambda _: None)
+
+    def _load(self) -> Dict[str, Dict]:
+        return read_json(self.path, {})
+
+    def _apply(self, key: str, fn: Callable[[Dict], Optional[Dict]]):
+        with file_lock(self.path):
+            data = self._load()
+            entry = fn(dict(data.get(key, {})))
+            if entry is None:
+                data.pop(key, None)
+            else:
+                data[key] = entry
+            write_json_atomic(self.path, data)
@@ -1,15 +1,31 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.api.routes import router
+from app.api.routes import router, admin_router
+from app.services.fetcher import RemoteFetcher
+from app.services.lifecycle import IndexLifecycleManager
 import logging
 
 logging.basicConfig(level=logging.INFO)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    lifecycle = IndexLifecycleManager()
+    eviction_task = asyncio.create_task(lifecycle.run_forever())
+    yield
+    eviction_task.cancel()
+    await lifecycle.flush()
+    await lifecycle.close()
+    await RemoteFetcher.aclose()
+
 app = FastAPI(
     title="Excel RAG OOP Project",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.include_router(router)
+app.include_router(admin_router)
 
 # For local running
 if __name__ == "__main__":